@@ -3,30 +3,74 @@
 Test runner script for IoT Hardware Automation system
 """
 
+import shlex
 import subprocess
 import sys
 import os
+import threading
 
 
-def run_command(command, description):
-    """Run a command and handle errors"""
-    print(f"\n{'='*50}")
-    print(f"Running: {description}")
-    print(f"Command: {command}")
-    print(f"{'='*50}")
+# Independent test suites, run concurrently. Each robot suite gets its own
+# output directory so the parallel runs don't overwrite each other's reports.
+COMMANDS = [
+    ("python -m pytest tests/ -v", "Unit Tests"),
+    ("python -m robot --outputdir robot_results/main robot_tests/iot_automation_tests.robot",
+     "Robot Framework - Main Tests"),
+    ("python -m robot --outputdir robot_results/additional robot_tests/additional_tests.robot",
+     "Robot Framework - Additional Tests"),
+]
+
+
+# The unit tests need no third-party pytest plugins, so skip entry-point
+# scanning at pytest startup
+TEST_ENV = dict(os.environ, PYTEST_DISABLE_PLUGIN_AUTOLOAD="1")
+
+
+# Serialises output from the concurrent suites so lines don't interleave mid-line
+_print_lock = threading.Lock()
+
+
+def start_command(command, description):
+    """Start a command in the background and stream its output as it arrives"""
+    with _print_lock:
+        print(f"\n{'='*50}")
+        print(f"Running: {description}")
+        print(f"Command: {command}")
+        print(f"{'='*50}")
     
-    try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error running {description}:")
-        print(f"Return code: {e.returncode}")
-        print(f"STDOUT: {e.stdout}")
-        print(f"STDERR: {e.stderr}")
+    process = subprocess.Popen(
+        shlex.split(command),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=TEST_ENV,
+    )
+    # Drain the pipe on its own thread so a chatty suite can't fill the
+    # pipe buffer and stall while another suite is being waited on
+    reader = threading.Thread(target=stream_output, args=(process, description), daemon=True)
+    reader.start()
+    return process, reader
+
+
+def stream_output(process, description):
+    """Print each output line of a command, prefixed with its suite name"""
+    for line in process.stdout:
+        with _print_lock:
+            print(f"[{description}] {line}", end="", flush=True)
+    process.stdout.close()
+
+
+def finish_command(process, reader, description):
+    """Wait for a started command to exit and handle errors"""
+    reader.join()
+    process.wait()
+    
+    if process.returncode != 0:
+        with _print_lock:
+            print(f"Error running {description}:")
+            print(f"Return code: {process.returncode}")
         return False
+    return True
 
 
 def main():
@@ -39,18 +83,13 @@ def main():
         print("Error: Please run this script from the project root directory")
         sys.exit(1)
     
-    success = True
-    
-    # unit tests
-    if not run_command("python -m pytest tests/ -v", "Unit Tests"):
-        success = False
+    # unit tests and Robot Framework tests
+    processes = [(*start_command(command, description), description) for command, description in COMMANDS]
     
-    # Robot Framework tests
-    if not run_command("python -m robot robot_tests/iot_automation_tests.robot", "Robot Framework - Main Tests"):
-        success = False
-    
-    if not run_command("python -m robot robot_tests/additional_tests.robot", "Robot Framework - Additional Tests"):
-        success = False
+    success = True
+    for process, reader, description in processes:
+        if not finish_command(process, reader, description):
+            success = False
     
     # Test results
     print(f"\n{'='*50}")
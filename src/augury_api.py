@@ -3,8 +3,55 @@ AuguryAPI - Fake API for IoT Hardware Automation
 Implements the required API methods for the system
 """
 
-from typing import Dict, List, Optional
-from src.models import Node, Endpoint, HardwareType, VersionArtifact
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.models import Node, Endpoint, HardwareType, VersionArtifact, _artifact_name
+
+
+# Artifact format: <hardware_type>_<version>.swu, e.g. ahn2_34.swu
+_ARTIFACT_RE = re.compile(r"([A-Za-z0-9]+)_(\d+)\.swu")
+
+
+# Sample fleet: (node uuid, node hardware type, ((serial, battery, endpoint hardware type), ...))
+_SAMPLE_NODES = (
+    ("AHN2_TBCDB1045001", HardwareType.AHN2, (
+        ("EP1_001", 3000, HardwareType.EP1),
+        ("EP2_001", 2800, HardwareType.EP2),
+        ("Canary_001", 3800, HardwareType.CANARY),
+    )),
+    ("Cassia_TBCDB1045002", HardwareType.CASSIA, (
+        ("EP1_002", 2600, HardwareType.EP1),
+        ("EP2_002", 2400, HardwareType.EP2),
+        ("Canary_002", 3700, HardwareType.CANARY),
+    )),
+    ("MOXA_TBCDB1045003", HardwareType.MOXA, (
+        ("EP1_003", 2900, HardwareType.EP1),
+        ("EP2_003", 2700, HardwareType.EP2),
+        ("Canary_003", 3900, HardwareType.CANARY),
+    )),
+)
+
+
+@dataclass
+class _OtaChannel:
+    """Artifacts uploaded to an OTA channel, with a count per exact artifact name"""
+    artifacts: List[str] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+    
+    def add(self, artifact: str):
+        """Add a validated artifact"""
+        self.artifacts.append(artifact)
+        self.counts[artifact] = self.counts.get(artifact, 0) + 1
+    
+    def remove(self, artifact: str):
+        """Remove one occurrence of an artifact"""
+        self.artifacts.remove(artifact)
+        self.counts[artifact] -= 1
+        if not self.counts[artifact]:
+            del self.counts[artifact]
 
 
 class AuguryAPI:
@@ -13,229 +60,226 @@ class AuguryAPI:
     def __init__(self):
         """Initialize the API with sample data"""
         self._nodes = self._create_sample_nodes()
-        self._ota_channels = {}  # ota_channel -> list of version artifacts
-        self._retry_count = 0
+        self._endpoint_index: Dict[str, Endpoint] = {
+            ep.serial_number: ep
+            for node in self._nodes.values()
+            for ep in node.endpoints
+        }  # serial_number -> endpoint
+        self._channel_to_node: Dict[str, Node] = {
+            node.ota_channel: node for node in self._nodes.values()
+        }  # ota_channel -> node
+        self._node_view_cache: Dict[str, Tuple[Tuple, Dict]] = {}  # uuid -> (rev key, view)
+        self._ota_channels: Dict[str, _OtaChannel] = defaultdict(_OtaChannel)  # ota_channel -> version artifacts
         self._max_retries = 3
+        self._pending_failures: Dict[str, int] = {}  # uuid -> update attempts left to fail
     
     def _create_sample_nodes(self) -> Dict[str, Node]:
         """Create sample nodes with endpoints"""
-        nodes = {}
-        
-        # Create AHN2 node
-        ahn2_endpoints = [
-            Endpoint("EP1_001", 3000, HardwareType.EP1, "AHN2_TBCDB1045001", "1.0"),
-            Endpoint("EP2_001", 2800, HardwareType.EP2, "AHN2_TBCDB1045001", "1.0"),
-            Endpoint("Canary_001", 3800, HardwareType.CANARY, "AHN2_TBCDB1045001", "1.0")
-        ]
-        nodes["AHN2_TBCDB1045001"] = Node("AHN2_TBCDB1045001", HardwareType.AHN2, "33", ahn2_endpoints)
-        
-        # Create Cassia node
-        cassia_endpoints = [
-            Endpoint("EP1_002", 2600, HardwareType.EP1, "Cassia_TBCDB1045002", "1.0"),
-            Endpoint("EP2_002", 2400, HardwareType.EP2, "Cassia_TBCDB1045002", "1.0"),
-            Endpoint("Canary_002", 3700, HardwareType.CANARY, "Cassia_TBCDB1045002", "1.0")
-        ]
-        nodes["Cassia_TBCDB1045002"] = Node("Cassia_TBCDB1045002", HardwareType.CASSIA, "33", cassia_endpoints)
-        
-        # Create Moxa node
-        moxa_endpoints = [
-            Endpoint("EP1_003", 2900, HardwareType.EP1, "MOXA_TBCDB1045003", "1.0"),
-            Endpoint("EP2_003", 2700, HardwareType.EP2, "MOXA_TBCDB1045003", "1.0"),
-            Endpoint("Canary_003", 3900, HardwareType.CANARY, "MOXA_TBCDB1045003", "1.0")
-        ]
-        nodes["MOXA_TBCDB1045003"] = Node("MOXA_TBCDB1045003", HardwareType.MOXA, "33", moxa_endpoints)
-        
-        return nodes
+        return {
+            uuid: Node(uuid, hardware_type, "33", [
+                Endpoint(serial_number, battery, endpoint_type, uuid, "1.0")
+                for serial_number, battery, endpoint_type in endpoints
+            ])
+            for uuid, hardware_type, endpoints in _SAMPLE_NODES
+        }
     
     def api_get_endpoint_by_serial(self, serial_number: str) -> Dict:
         """Get endpoint information by serial number"""
-        for node in self._nodes.values():
-            endpoint = node.get_endpoint_by_serial(serial_number)
-            if endpoint:
-                return {
-                    "serial_number": endpoint.serial_number,
-                    "battery": endpoint.battery,
-                    "hardware_type": endpoint.hardware_type.value,
-                    "uuid": endpoint.uuid,
-                    "version": endpoint.version,
-                    "backlog": endpoint.backlog
-                }
-        return {}
+        endpoint = self._endpoint_index.get(serial_number)
+        if not endpoint:
+            return {}
+        return endpoint.as_dict()
     
     def api_get_node_by_uuid(self, uuid: str) -> Dict:
         """Get node information by UUID"""
         node = self._nodes.get(uuid)
-        if node:
-            return {
+        if not node:
+            return {}
+        
+        # Reuse the cached view until the node or one of its endpoints is mutated
+        key = (node._rev, tuple(ep._rev for ep in node.endpoints))
+        cached = self._node_view_cache.get(uuid)
+        if cached and cached[0] == key:
+            view = cached[1]
+        else:
+            view = {
                 "uuid": node.uuid,
                 "ota_channel": node.ota_channel,
                 "version": node.version,
-                "endpoints": [
-                    {
-                        "serial_number": ep.serial_number,
-                        "battery": ep.battery,
-                        "hardware_type": ep.hardware_type.value,
-                        "uuid": ep.uuid,
-                        "version": ep.version,
-                        "backlog": ep.backlog
-                    }
-                    for ep in node.endpoints
-                ]
+                "endpoints": [ep.as_dict() for ep in node.endpoints]
             }
-        return {}
+            self._node_view_cache[uuid] = (key, view)
+        
+        # Hand out copies so callers can't corrupt the cached view
+        return {**view, "endpoints": [ep.copy() for ep in view["endpoints"]]}
     
     def api_post_version_to_ota_channel(self, ota_channel: str, version_artifact: str) -> int:
         """Add new version to OTA channel"""
-        try:
-            if ota_channel not in self._ota_channels:
-                self._ota_channels[ota_channel] = []
-            
-            # Validate artifact format
-            if not self._is_valid_artifact(version_artifact):
-                return 400
-            
-            self._ota_channels[ota_channel].append(version_artifact)
-            return 200
-        except Exception:
+        # Only channels that belong to a known node accept uploads
+        if ota_channel not in self._channel_to_node:
             return 400
+        
+        # Validate artifact format
+        if not self._is_valid_artifact(version_artifact):
+            return 400
+        
+        self._ota_channels[ota_channel].add(version_artifact)
+        return 200
     
     def api_clear_ota_channel(self, ota_channel: str, version_artifact: str) -> int:
         """Clear an artifact from the OTA channel"""
         try:
-            if ota_channel in self._ota_channels:
-                if version_artifact in self._ota_channels[ota_channel]:
-                    self._ota_channels[ota_channel].remove(version_artifact)
-                    return 200
+            channel = self._ota_channels.get(ota_channel)
+            if channel and version_artifact in channel.counts:
+                channel.remove(version_artifact)
+                return 200
             return 400
         except Exception:
             return 400
     
     def _is_valid_artifact(self, artifact: str) -> bool:
         """Validate artifact format"""
-        try:
-            if not artifact.endswith('.swu'):
-                return False
-            parts = artifact.split('_')
-            if len(parts) != 2:
-                return False
-            version_part = parts[1].replace('.swu', '')
-            int(version_part)  # Check if version is number
-            return True
-        except (ValueError, IndexError):
-            return False
+        return _ARTIFACT_RE.fullmatch(artifact) is not None
     
     def simulate_ota_update(self, uuid: str, target_version: str) -> bool:
         """Simulate OTA update process with retries"""
+        return any(success for _, success in self.iter_simulate_ota_update(uuid, target_version))
+    
+    def iter_simulate_ota_update(self, uuid: str, target_version: str) -> Iterator[Tuple[int, bool]]:
+        """Simulate OTA update process, yielding (attempt, success) as each attempt completes.
+        
+        Yields nothing for an unknown node, and a single (0, False) when the
+        target version is rejected before any attempt is made.
+        """
         node = self._nodes.get(uuid)
         if not node:
-            return False
+            return
         
-        # Check if version exists in OTA channel
-        ota_channel = node.ota_channel
-        if ota_channel not in self._ota_channels:
-            return False
-        
-        # Find matching artifact
-        target_artifact = None
-        for artifact in self._ota_channels[ota_channel]:
-            if artifact.endswith(f"_{target_version}.swu"):
-                target_artifact = artifact
-                break
-        
-        if not target_artifact:
-            return False
+        # Compatibility cannot change between retries, so check it once up front
+        if not self._is_version_compatible(node, target_version):
+            yield 0, False
+            return
         
         # Simulate retry logic
-        self._retry_count = 0
-        while self._retry_count < self._max_retries:
-            self._retry_count += 1
+        for attempt in range(1, self._max_retries + 1):
             # Simulate update process
-            if self._perform_update(node, target_version):
-                return True
-        
-        return False
+            success = self._perform_update(node, target_version)
+            yield attempt, success
+            if success:
+                return
     
     def _perform_update(self, node: Node, version: str) -> bool:
-        """Perform the actual update"""
-        try:
-            # Validate version compatibility
-            if not self._is_version_compatible(node, version):
-                return False
-            
-            # Update node version
-            node.version = version
-            return True
-        except Exception:
+        """Perform the actual update (compatibility already checked by the caller)"""
+        # Consume one injected failure, if any are pending for this node
+        failures = self._pending_failures.get(node.uuid, 0)
+        if failures > 0:
+            self._pending_failures[node.uuid] = failures - 1
             return False
+        node.version = version
+        node._touch()
+        return True
     
     def _is_version_compatible(self, node: Node, version: str) -> bool:
         """Check if version is compatible with node hardware type"""
-        try:
-            version_num = int(version)
-            current_version = int(node.version)
-            
-            # Version should be newer than current
-            if version_num <= current_version:
-                return False
-            
-            # Check for a matching artifact for this hardware type
-            ota_channel = node.ota_channel
-            if ota_channel not in self._ota_channels:
-                return False
-            
-            # Find matching artifact for this hardware type
-            expected_prefix = f"{node.hardware_type.value.lower()}_{version}.swu"
-            matching_artifact = None
-            for artifact in self._ota_channels[ota_channel]:
-                if artifact == expected_prefix:
-                    matching_artifact = artifact
-                    break
-            
-            # no matching artifact found, incompatible
-            if not matching_artifact:
-                return False
-            
-            return True
-        except ValueError:
+        if not version.isdecimal() or not node.version.isdecimal():
             return False
+        
+        # Version should be newer than current
+        if int(version) <= int(node.version):
+            return False
+        
+        # no matching artifact for this hardware type, incompatible
+        if not self._find_artifact(node, version):
+            return False
+        
+        return True
+    
+    def _find_artifact(self, node: Node, version: str) -> Optional[str]:
+        """Find the artifact for this node's hardware type and version in its OTA channel"""
+        channel = self._ota_channels.get(node.ota_channel)
+        if not channel:
+            return None
+        artifact = _artifact_name(node.hardware_type, version)
+        return artifact if artifact in channel.counts else None
     
     def simulate_endpoint_dfu(self, serial_number: str, target_version: str) -> bool:
         """Simulate endpoint DFU process"""
-        for node in self._nodes.values():
-            endpoint = node.get_endpoint_by_serial(serial_number)
-            if endpoint:
-                # Check if endpoint can update
-                if not endpoint.can_update:
-                    return False
-                
-                # Perform update
-                endpoint.version = target_version
-                return True
+        endpoint = self._endpoint_index.get(serial_number)
+        if not endpoint:
+            return False
+        
+        # Check if endpoint can update
+        if not endpoint.can_update:
+            return False
+        
+        # Perform update
+        endpoint.version = target_version
+        endpoint._touch()
+        return True
+    
+    def bulk_simulate_ota_update(self, requests: List[Tuple[str, str]],
+                                 max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """Simulate OTA updates for many nodes, returning uuid -> success.
+        
+        Each uuid may appear only once in requests; duplicates raise
+        ValueError before any update runs. With max_workers set, nodes
+        are updated concurrently.
+        """
+        return self._run_bulk(self.simulate_ota_update, requests, max_workers)
+    
+    def bulk_simulate_endpoint_dfu(self, requests: List[Tuple[str, str]],
+                                   max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """Simulate DFU for many endpoints, returning serial_number -> success.
         
-        return False
+        Each serial number may appear only once in requests; duplicates raise
+        ValueError before any update runs. With max_workers set, endpoints
+        are updated concurrently.
+        """
+        return self._run_bulk(self.simulate_endpoint_dfu, requests, max_workers)
+    
+    def _run_bulk(self, update, requests: List[Tuple[str, str]],
+                  max_workers: Optional[int]) -> Dict[str, bool]:
+        """Apply update to each (id, version) pair, sequentially or in a thread pool"""
+        ids = [device_id for device_id, _ in requests]
+        # Results are keyed by id, so a repeated id would silently drop a result
+        if len(set(ids)) != len(ids):
+            raise ValueError("bulk requests must not repeat a device id")
+        if not max_workers:
+            return {device_id: update(device_id, version) for device_id, version in requests}
+        versions = [version for _, version in requests]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(ids, executor.map(update, ids, versions)))
     
     def set_endpoint_backlog(self, serial_number: str, backlog: int) -> bool:
         """Set endpoint backlog"""
-        for node in self._nodes.values():
-            endpoint = node.get_endpoint_by_serial(serial_number)
-            if endpoint:
-                endpoint.backlog = backlog
-                return True
-        return False
+        endpoint = self._endpoint_index.get(serial_number)
+        if not endpoint:
+            return False
+        endpoint.backlog = backlog
+        endpoint._touch()
+        return True
     
     def set_endpoint_battery(self, serial_number: str, battery: int) -> bool:
         """Set endpoint battery level"""
-        for node in self._nodes.values():
-            endpoint = node.get_endpoint_by_serial(serial_number)
-            if endpoint:
-                endpoint.battery = battery
-                return True
-        return False
+        endpoint = self._endpoint_index.get(serial_number)
+        if not endpoint:
+            return False
+        endpoint.battery = battery
+        endpoint._touch()
+        return True
+    
+    def set_node_update_failures(self, uuid: str, failures: int) -> bool:
+        """Make the next `failures` OTA update attempts on a node fail"""
+        if uuid not in self._nodes or failures < 0:
+            return False
+        self._pending_failures[uuid] = failures
+        return True
     
     def get_ota_channel_versions(self, ota_channel: str) -> List[str]:
         """Get all versions in OTA channel"""
-        return self._ota_channels.get(ota_channel, [])
+        channel = self._ota_channels.get(ota_channel)
+        # Copy, so callers can't desync the list from the channel's counts
+        return list(channel.artifacts) if channel else []
     
     def reset_retry_count(self):
-        """Reset retry count for testing"""
-        self._retry_count = 0
+        """Kept for backwards compatibility; retries are no longer tracked on the instance"""
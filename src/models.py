@@ -3,12 +3,13 @@ IoT Hardware Automation Domain Models
 Contains Node, Endpoint, and related classes
 """
 
-from typing import List, Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 
-class HardwareType(Enum):
+class HardwareType(str, Enum):
     """Hardware types for nodes and endpoints"""
     AHN2 = "AHN2"
     CASSIA = "Cassia"
@@ -18,7 +19,22 @@ class HardwareType(Enum):
     CANARY = "Canary_A"
 
 
-@dataclass
+# Battery threshold (mA) per endpoint hardware type
+_THRESHOLD_BY_HW = {
+    HardwareType.EP1: 2500,
+    HardwareType.EP2: 2500,
+    HardwareType.CANARY: 3600,
+}
+
+# API endpoint per node hardware type
+_API_ENDPOINT_BY_HW = {
+    HardwareType.AHN2: "buildroot_api.azure",
+    HardwareType.CASSIA: "buildroot_api.azure",
+    HardwareType.MOXA: "moxa_api.azure",
+}
+
+
+@dataclass(slots=True)
 class Endpoint:
     """Represents an IoT endpoint (sensor)"""
     serial_number: str
@@ -27,15 +43,27 @@ class Endpoint:
     uuid: str
     version: str
     backlog: int = 0
+    _rev: int = field(default=0, init=False, repr=False, compare=False)  # bumped by _touch() on mutation
+    battery_threshold: int = field(init=False, repr=False, compare=False)
+    _view: Optional[Tuple[int, Dict]] = field(default=None, init=False, repr=False, compare=False)
     
-    @property
-    def battery_threshold(self) -> int:
-        """Returns battery threshold based on hardware type"""
-        if self.hardware_type in [HardwareType.EP1, HardwareType.EP2]:
-            return 2500
-        elif self.hardware_type == HardwareType.CANARY:
-            return 3600
-        return 2500  # default
+    def as_dict(self) -> Dict:
+        """Returns API representation, copied from a view cached until the endpoint is next touched"""
+        view = self._view
+        if view is None or view[0] != self._rev:
+            view = self._view = (self._rev, {
+                "serial_number": self.serial_number,
+                "battery": self.battery,
+                "hardware_type": self.hardware_type.value,
+                "uuid": self.uuid,
+                "version": self.version,
+                "backlog": self.backlog
+            })
+        return view[1].copy()
+    
+    def _touch(self):
+        """Invalidate cached views after a field has been changed"""
+        self._rev += 1
     
     @property
     def can_update(self) -> bool:
@@ -43,27 +71,16 @@ class Endpoint:
         return self.backlog == 0 and self.battery >= self.battery_threshold
 
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     """Represents an IoT node (gateway)"""
     uuid: str
     hardware_type: HardwareType
     version: str
     endpoints: List[Endpoint]
-    
-    @property
-    def ota_channel(self) -> str:
-        """Returns OTA channel name for this node"""
-        return f"OTA_{self.uuid}"
-    
-    @property
-    def api_endpoint(self) -> str:
-        """Returns API endpoint based on hardware type"""
-        if self.hardware_type in [HardwareType.AHN2, HardwareType.CASSIA]:
-            return "buildroot_api.azure"
-        elif self.hardware_type == HardwareType.MOXA:
-            return "moxa_api.azure"
-        return "default_api.azure"
+    _rev: int = field(default=0, init=False, repr=False, compare=False)  # bumped by _touch() on mutation
+    ota_channel: str = field(init=False, repr=False, compare=False)
+    api_endpoint: str = field(init=False, repr=False, compare=False)
     
     def get_endpoint_by_serial(self, serial_number: str) -> Optional[Endpoint]:
         """Get endpoint by serial number"""
@@ -74,23 +91,50 @@ class Node:
     
     def update_version(self, new_version: str) -> bool:
         """Update node version"""
-        try:
-            # Validate version format and ensure it's higher than current
-            if not self._is_valid_version(new_version):
-                return False
-            self.version = new_version
-            return True
-        except Exception:
+        # Validate version format and ensure it's higher than current
+        if not self._is_valid_version(new_version):
             return False
+        self.version = new_version
+        self._touch()
+        return True
+    
+    def _touch(self):
+        """Invalidate cached views after a field has been changed"""
+        self._rev += 1
     
     def _is_valid_version(self, version: str) -> bool:
         """Validate version format and ensure it's higher than current version"""
-        try:
-            version_num = int(version)
-            current_version = int(self.version)
-            return version_num > current_version
-        except ValueError:
+        if not version.isdecimal() or not self.version.isdecimal():
             return False
+        return int(version) > int(self.version)
+
+
+def _derive_on_assign(cls, source: str, target: str, derive):
+    """Turn slot field `source` into a property whose setter also stores derive(value) in `target`"""
+    source_slot = cls.__dict__[source]
+    set_source = source_slot.__set__
+    set_target = cls.__dict__[target].__set__
+    
+    def _set(self, value):
+        set_source(self, value)
+        set_target(self, derive(value))
+    
+    setattr(cls, source, property(source_slot.__get__, _set))
+
+
+# Derived attributes are precomputed whenever their source field is assigned,
+# including by the dataclass __init__, so reassigning the source never leaves them stale
+_derive_on_assign(Endpoint, "hardware_type", "battery_threshold",
+                  lambda hardware_type: _THRESHOLD_BY_HW.get(hardware_type, 2500))
+_derive_on_assign(Node, "uuid", "ota_channel", "OTA_{}".format)
+_derive_on_assign(Node, "hardware_type", "api_endpoint",
+                  lambda hardware_type: _API_ENDPOINT_BY_HW.get(hardware_type, "default_api.azure"))
+
+
+@lru_cache(maxsize=256)
+def _artifact_name(hardware_type: HardwareType, version: str) -> str:
+    """Build artifact name in required format"""
+    return f"{hardware_type.lower()}_{version}.swu"
 
 
 @dataclass
@@ -102,4 +146,4 @@ class VersionArtifact:
     @property
     def artifact_name(self) -> str:
         """Returns artifact name in required format"""
-        return f"{self.hardware_type.value.lower()}_{self.version}.swu"
+        return _artifact_name(self.hardware_type, self.version)
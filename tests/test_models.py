@@ -2,11 +2,35 @@
 Unit tests for IoT Hardware Automation system
 """
 
+import json
+import sys
+
 import pytest
 from src.models import Node, Endpoint, HardwareType, VersionArtifact
 from src.augury_api import AuguryAPI
 
 
+# Hardware type aliases, bound once at import
+AHN2, CASSIA, MOXA = HardwareType.AHN2, HardwareType.CASSIA, HardwareType.MOXA
+EP1, EP2, CANARY = HardwareType.EP1, HardwareType.EP2, HardwareType.CANARY
+
+# Sample AHN2 node identifiers shared across API tests
+UUID_AHN2 = sys.intern("AHN2_TBCDB1045001")
+OTA_AHN2 = sys.intern("OTA_AHN2_TBCDB1045001")
+SWU_AHN2_34 = sys.intern("ahn2_34.swu")
+
+# Expected API views of the sample data
+EXPECTED_EP1 = {
+    "serial_number": "EP1_001",
+    "battery": 3000,
+    "hardware_type": "EP1",
+    "uuid": UUID_AHN2,
+    "version": "1.0",
+    "backlog": 0,
+}
+EXPECTED_AHN2_NODE = {"uuid": UUID_AHN2, "ota_channel": OTA_AHN2, "version": "33"}
+
+
 @pytest.fixture
 def endpoint_factory():
     """Factory fixture for creating endpoints with different parameters"""
@@ -36,13 +60,19 @@ def node_factory():
 @pytest.fixture
 def sample_endpoint(endpoint_factory):
     """Fixture for creating a sample endpoint"""
-    return endpoint_factory(HardwareType.EP1)
+    return endpoint_factory(EP1)
 
 
 @pytest.fixture
 def sample_node(node_factory):
     """Fixture for creating a sample node"""
-    return node_factory(HardwareType.AHN2)
+    return node_factory(AHN2)
+
+
+@pytest.fixture(scope="class")
+def ep1():
+    """Fixture for a shared EP1 endpoint, for tests that do not mutate it"""
+    return Endpoint("EP1_001", 3000, EP1, "EP1_TEST001", "1.0")
 
 
 @pytest.fixture
@@ -51,27 +81,55 @@ def api():
     return AuguryAPI()
 
 
+@pytest.fixture
+def ota_ready(api):
+    """Fixture for an AuguryAPI with ahn2_34.swu already posted to the AHN2 OTA channel"""
+    api.api_post_version_to_ota_channel(OTA_AHN2, SWU_AHN2_34)
+    return api, OTA_AHN2, SWU_AHN2_34
+
+
+@pytest.fixture
+def ep1_state(api, request):
+    """Fixture for an AuguryAPI with EP1_001 (backlog, battery) taken from request.param"""
+    backlog, battery = request.param
+    api.set_endpoint_backlog("EP1_001", backlog)
+    api.set_endpoint_battery("EP1_001", battery)
+    return api
+
+
+@pytest.fixture(scope="module")
+def api_ro():
+    """Fixture for a shared AuguryAPI instance, for tests that do not mutate it"""
+    return AuguryAPI()
+
+
 class TestEndpoint:
     """Test cases for Endpoint class"""
     
-    def test_endpoint_creation(self, endpoint_factory):
+    def test_endpoint_creation(self, ep1):
         """Test endpoint creation with valid data"""
-        endpoint = endpoint_factory(HardwareType.EP1)
-        assert endpoint.serial_number == "EP1_001"
-        assert endpoint.battery == 3000
-        assert endpoint.hardware_type == HardwareType.EP1
-        assert endpoint.version == "1.0"
+        assert ep1.serial_number == "EP1_001"
+        assert ep1.battery == 3000
+        assert ep1.hardware_type == EP1
+        assert ep1.version == "1.0"
     
     @pytest.mark.parametrize("hardware_type,expected_threshold", [
-        (HardwareType.EP1, 2500),
-        (HardwareType.EP2, 2500),
-        (HardwareType.CANARY, 3600),
+        (EP1, 2500),
+        (EP2, 2500),
+        (CANARY, 3600),
     ])
     def test_battery_threshold(self, endpoint_factory, hardware_type, expected_threshold):
         """Test battery thresholds for different hardware types"""
         endpoint = endpoint_factory(hardware_type)
         assert endpoint.battery_threshold == expected_threshold
     
+    def test_battery_threshold_follows_hardware_type(self, endpoint_factory):
+        """Test battery threshold is recomputed when hardware type is reassigned"""
+        endpoint = endpoint_factory(EP1)
+        endpoint.hardware_type = CANARY
+        assert endpoint.battery_threshold == 3600
+        assert endpoint.can_update is False
+    
     @pytest.mark.parametrize("backlog,battery,expected", [
         (5, 3000, False),    # backlog > 0
         (0, 2000, False),   # battery below threshold
@@ -79,9 +137,33 @@ class TestEndpoint:
     ])
     def test_can_update_conditions(self, endpoint_factory, backlog, battery, expected):
         """Test can_update under different conditions"""
-        endpoint = endpoint_factory(HardwareType.EP1, battery=battery)
+        endpoint = endpoint_factory(EP1, battery=battery)
         endpoint.backlog = backlog
         assert endpoint.can_update == expected
+    
+    def test_hardware_type_is_str(self, endpoint_factory):
+        """Test hardware type compares equal to its plain string value"""
+        endpoint = endpoint_factory(CANARY)
+        assert endpoint.hardware_type == "Canary_A"
+        assert endpoint.as_dict()["hardware_type"] == "Canary_A"
+    
+    def test_as_dict_cached_until_mutation(self, endpoint_factory):
+        """Test as_dict reuses its cached view until the endpoint is touched"""
+        endpoint = endpoint_factory(EP1)
+        assert endpoint.as_dict()["hardware_type"] == "EP1"
+        cached = endpoint._view
+        endpoint.as_dict()
+        assert endpoint._view is cached
+        
+        endpoint.version = "2.0"
+        endpoint._touch()
+        assert endpoint.as_dict()["version"] == "2.0"
+    
+    def test_as_dict_returns_copy(self, endpoint_factory):
+        """Test callers cannot corrupt the cached view"""
+        endpoint = endpoint_factory(EP1)
+        endpoint.as_dict()["version"] = "2.0"
+        assert endpoint.as_dict()["version"] == "1.0"
 
 
 class TestNode:
@@ -89,21 +171,29 @@ class TestNode:
     
     def test_node_creation(self, node_factory):
         """Test node creation with valid data"""
-        node = node_factory(HardwareType.AHN2)
+        node = node_factory(AHN2)
         assert node.uuid == "AHN2_TEST001"
-        assert node.hardware_type == HardwareType.AHN2
+        assert node.hardware_type == AHN2
         assert node.version == "33"
         assert len(node.endpoints) == 1
     
     def test_ota_channel_format(self, node_factory):
         """Test OTA channel format"""
-        node = node_factory(HardwareType.AHN2)
+        node = node_factory(AHN2)
         assert node.ota_channel == "OTA_AHN2_TEST001"
     
+    def test_derived_attributes_follow_reassignment(self, node_factory):
+        """Test OTA channel and API endpoint are recomputed when their source field is reassigned"""
+        node = node_factory(AHN2)
+        node.uuid = "Moxa_TEST002"
+        node.hardware_type = MOXA
+        assert node.ota_channel == "OTA_Moxa_TEST002"
+        assert node.api_endpoint == "moxa_api.azure"
+    
     @pytest.mark.parametrize("hardware_type,expected_endpoint", [
-        (HardwareType.AHN2, "buildroot_api.azure"),
-        (HardwareType.CASSIA, "buildroot_api.azure"),
-        (HardwareType.MOXA, "moxa_api.azure"),
+        (AHN2, "buildroot_api.azure"),
+        (CASSIA, "buildroot_api.azure"),
+        (MOXA, "moxa_api.azure"),
     ])
     def test_api_endpoints(self, node_factory, hardware_type, expected_endpoint):
         """Test API endpoints for different hardware types"""
@@ -112,7 +202,7 @@ class TestNode:
     
     def test_get_endpoint_by_serial(self, node_factory):
         """Test getting endpoint by serial number"""
-        node = node_factory(HardwareType.AHN2)
+        node = node_factory(AHN2)
         endpoint = node.get_endpoint_by_serial("AHN2_001")
         assert endpoint is not None
         assert endpoint.serial_number == "AHN2_001"
@@ -123,11 +213,13 @@ class TestNode:
     @pytest.mark.parametrize("version,expected_result", [
         ("34", True),
         ("abc", False),
+        ("", False),
+        ("34.1", False),
         ("32", False),  # lower version
     ])
     def test_update_version(self, node_factory, version, expected_result):
         """Test version updates with different inputs"""
-        node = node_factory(HardwareType.AHN2)
+        node = node_factory(AHN2)
         original_version = node.version
         result = node.update_version(version)
         assert result == expected_result
@@ -138,127 +230,270 @@ class TestNode:
             assert node.version == original_version
 
 
+class TestVersionArtifact:
+    """Test cases for VersionArtifact class"""
+    
+    @pytest.mark.parametrize("hardware_type,version,expected_name", [
+        (AHN2, "34", SWU_AHN2_34),
+        (MOXA, "33", "moxa_33.swu"),
+    ])
+    def test_artifact_name(self, hardware_type, version, expected_name):
+        """Test artifact name format"""
+        assert VersionArtifact(hardware_type, version).artifact_name == expected_name
+
+
 class TestAuguryAPI:
     """Test cases for AuguryAPI class"""
     
-    def test_api_initialization(self):
+    def test_api_initialization(self, api_ro):
         """Test API initialization"""
-        api = AuguryAPI()
-        assert len(api._nodes) == 3
-        assert "AHN2_TBCDB1045001" in api._nodes
-        assert "Cassia_TBCDB1045002" in api._nodes
-        assert "MOXA_TBCDB1045003" in api._nodes
+        assert len(api_ro._nodes) == 3
+        assert UUID_AHN2 in api_ro._nodes
+        assert "Cassia_TBCDB1045002" in api_ro._nodes
+        assert "MOXA_TBCDB1045003" in api_ro._nodes
     
-    def test_get_endpoint_by_serial(self):
+    def test_get_endpoint_by_serial(self, api_ro):
         """Test getting endpoint by serial number"""
-        api = AuguryAPI()
-        result = api.api_get_endpoint_by_serial("EP1_001")
-        assert result["serial_number"] == "EP1_001"
-        assert result["hardware_type"] == "EP1"
+        assert api_ro.api_get_endpoint_by_serial("EP1_001") == EXPECTED_EP1
+    
+    def test_get_endpoint_by_serial_other_node(self, api):
+        """Test getting endpoint that belongs to a non-first node"""
+        result = api.api_get_endpoint_by_serial("Canary_003")
+        assert result["serial_number"] == "Canary_003"
+        assert result["uuid"] == "MOXA_TBCDB1045003"
+        assert api.set_endpoint_battery("Canary_003", 3650) is True
+        assert api.api_get_endpoint_by_serial("Canary_003")["battery"] == 3650
     
-    def test_get_endpoint_by_serial_not_found(self):
+    def test_get_endpoint_by_serial_not_found(self, api_ro):
         """Test getting non-existent endpoint"""
-        api = AuguryAPI()
-        result = api.api_get_endpoint_by_serial("EP999_001")
+        result = api_ro.api_get_endpoint_by_serial("EP999_001")
         assert result == {}
     
-    def test_get_node_by_uuid(self):
+    def test_get_node_by_uuid(self, api_ro):
         """Test getting node by UUID"""
-        api = AuguryAPI()
-        result = api.api_get_node_by_uuid("AHN2_TBCDB1045001")
-        assert result["uuid"] == "AHN2_TBCDB1045001"
-        assert result["version"] == "33"
+        result = api_ro.api_get_node_by_uuid(UUID_AHN2)
+        assert EXPECTED_AHN2_NODE.items() <= result.items()
+        assert result["endpoints"][0] == EXPECTED_EP1
         assert len(result["endpoints"]) == 3
     
-    def test_get_node_by_uuid_not_found(self):
+    def test_get_node_by_uuid_reflects_mutations(self, api):
+        """Test cached node view is refreshed after an endpoint changes"""
+        api.api_get_node_by_uuid(UUID_AHN2)
+        cached = api._node_view_cache[UUID_AHN2]
+        api.api_get_node_by_uuid(UUID_AHN2)
+        assert api._node_view_cache[UUID_AHN2] is cached
+        
+        api.set_endpoint_backlog("EP1_001", 7)
+        result = api.api_get_node_by_uuid(UUID_AHN2)
+        assert result["endpoints"][0]["backlog"] == 7
+        assert api.api_get_endpoint_by_serial("EP1_001")["backlog"] == 7
+    
+    def test_get_node_by_uuid_returns_copy(self, api):
+        """Test callers cannot corrupt the cached node view"""
+        result = api.api_get_node_by_uuid(UUID_AHN2)
+        result["version"] = "99"
+        result["endpoints"][0]["battery"] = 0
+        result["endpoints"].clear()
+        
+        result = api.api_get_node_by_uuid(UUID_AHN2)
+        assert EXPECTED_AHN2_NODE.items() <= result.items()
+        assert result["endpoints"][0] == EXPECTED_EP1
+        assert json.loads(json.dumps(result)) == result
+    
+    def test_get_node_by_uuid_not_found(self, api_ro):
         """Test getting non-existent node"""
-        api = AuguryAPI()
-        result = api.api_get_node_by_uuid("NONEXISTENT_UUID")
+        result = api_ro.api_get_node_by_uuid("NONEXISTENT_UUID")
         assert result == {}
     
-    def test_post_version_to_ota_channel_valid(self):
-        """Test posting valid version to OTA channel"""
-        api = AuguryAPI()
-        result = api.api_post_version_to_ota_channel("OTA_AHN2_TBCDB1045001", "ahn2_34.swu")
-        assert result == 200
-    
-    def test_post_version_to_ota_channel_invalid(self):
-        """Test posting invalid version to OTA channel"""
-        api = AuguryAPI()
-        result = api.api_post_version_to_ota_channel("OTA_AHN2_TBCDB1045001", "invalid_format.swu")
+    def test_post_version_to_unknown_ota_channel(self, api):
+        """Test posting to a channel that belongs to no node"""
+        result = api.api_post_version_to_ota_channel("OTA_UNKNOWN_UUID", SWU_AHN2_34)
         assert result == 400
+        assert api.get_ota_channel_versions("OTA_UNKNOWN_UUID") == []
     
-    def test_clear_ota_channel(self):
+    @pytest.mark.parametrize("artifact,expected_result", [
+        (SWU_AHN2_34, 200),
+        ("moxa_36.swu", 200),
+        ("invalid_format.swu", 400),
+        ("ahn2.swu", 400),
+        ("ahn2_abc.swu", 400),
+        ("ahn2_34.txt", 400),
+        ("ahn2_34.swu.bak", 400),
+        ("ahn2_v2_34.swu", 400),
+    ])
+    def test_post_version_to_ota_channel(self, api, artifact, expected_result):
+        """Test posting valid and invalid versions to OTA channel"""
+        result = api.api_post_version_to_ota_channel(OTA_AHN2, artifact)
+        assert result == expected_result
+    
+    def test_clear_ota_channel(self, ota_ready):
         """Test clearing OTA channel"""
-        api = AuguryAPI()
-        ota_channel = "OTA_AHN2_TBCDB1045001"
-        
-        # Add version first
-        api.api_post_version_to_ota_channel(ota_channel, "ahn2_34.swu")
+        api, ota_channel, artifact = ota_ready
         
         # Clear version
-        result = api.api_clear_ota_channel(ota_channel, "ahn2_34.swu")
+        result = api.api_clear_ota_channel(ota_channel, artifact)
         assert result == 200
         
         # Verify version is removed
         versions = api.get_ota_channel_versions(ota_channel)
-        assert "ahn2_34.swu" not in versions
+        assert artifact not in versions
     
-    def test_simulate_ota_update_success(self):
-        """Test successful OTA update"""
-        api = AuguryAPI()
-        ota_channel = "OTA_AHN2_TBCDB1045001"
+    def test_get_ota_channel_versions_returns_copy(self, ota_ready):
+        """Test mutating the returned versions list does not affect the channel"""
+        api, ota_channel, artifact = ota_ready
+        api.get_ota_channel_versions(ota_channel).clear()
         
-        # Add version to channel
-        api.api_post_version_to_ota_channel(ota_channel, "ahn2_34.swu")
+        assert api.get_ota_channel_versions(ota_channel) == [artifact]
+        assert api.api_clear_ota_channel(ota_channel, artifact) == 200
+        assert api.simulate_ota_update(UUID_AHN2, "34") is False
+    
+    def test_simulate_ota_update_success(self, ota_ready):
+        """Test successful OTA update"""
+        api, _, _ = ota_ready
         
         # Simulate update
-        result = api.simulate_ota_update("AHN2_TBCDB1045001", "34")
+        result = api.simulate_ota_update(UUID_AHN2, "34")
         assert result is True
         
         # Verify version updated
-        node_info = api.api_get_node_by_uuid("AHN2_TBCDB1045001")
+        node_info = api.api_get_node_by_uuid(UUID_AHN2)
         assert node_info["version"] == "34"
     
-    def test_simulate_endpoint_dfu_success(self):
-        """Test successful endpoint DFU"""
-        api = AuguryAPI()
+    @pytest.mark.parametrize("failures,expected_result,expected_version", [
+        (1, True, "34"),    # retried and succeeds on attempt 2
+        (2, True, "34"),    # succeeds on the last attempt
+        (3, False, "33"),   # every attempt fails
+    ])
+    def test_simulate_ota_update_retries(self, ota_ready, failures, expected_result, expected_version):
+        """Test OTA update retries failed attempts up to the retry limit"""
+        api, _, _ = ota_ready
+        assert api.set_node_update_failures(UUID_AHN2, failures) is True
         
-        # Set backlog to 0 and battery above threshold
-        api.set_endpoint_backlog("EP1_001", 0)
-        api.set_endpoint_battery("EP1_001", 3000)
+        assert api.simulate_ota_update(UUID_AHN2, "34") is expected_result
+        assert api.api_get_node_by_uuid(UUID_AHN2)["version"] == expected_version
+    
+    def test_set_node_update_failures_unknown_node(self, api_ro):
+        """Test injecting failures into an unknown node is rejected"""
+        assert api_ro.set_node_update_failures("NONEXISTENT_UUID", 1) is False
+    
+    def test_set_node_update_failures_negative(self, ota_ready):
+        """Test a negative failure count is rejected and does not block updates"""
+        api, _, _ = ota_ready
+        assert api.set_node_update_failures(UUID_AHN2, -1) is False
         
-        # Simulate DFU
-        result = api.simulate_endpoint_dfu("EP1_001", "2.0")
-        assert result is True
+        assert api.simulate_ota_update(UUID_AHN2, "34") is True
+    
+    @pytest.mark.parametrize("failures,expected", [
+        (0, [(1, True)]),
+        (1, [(1, False), (2, True)]),
+        (3, [(1, False), (2, False), (3, False)]),
+    ])
+    def test_iter_simulate_ota_update(self, ota_ready, failures, expected):
+        """Test OTA update progress is reported per attempt"""
+        api, _, _ = ota_ready
+        api.set_node_update_failures(UUID_AHN2, failures)
         
-        # Verify version updated
-        endpoint_info = api.api_get_endpoint_by_serial("EP1_001")
-        assert endpoint_info["version"] == "2.0"
+        assert list(api.iter_simulate_ota_update(UUID_AHN2, "34")) == expected
     
-    def test_simulate_endpoint_dfu_with_backlog(self):
-        """Test endpoint DFU with backlog"""
-        api = AuguryAPI()
+    def test_iter_simulate_ota_update_rejected(self, ota_ready):
+        """Test an incompatible version is reported, unlike an unknown node"""
+        api, _, _ = ota_ready
         
-        # Set backlog > 0
-        api.set_endpoint_backlog("EP1_001", 5)
+        # No ahn2_35.swu in the channel, so the update is rejected up front
+        assert list(api.iter_simulate_ota_update(UUID_AHN2, "35")) == [(0, False)]
+        assert list(api.iter_simulate_ota_update("NONEXISTENT_UUID", "34")) == []
+    
+    @pytest.mark.parametrize("artifact,version", [
+        ("ahn2_32.swu", "32"),   # older than current
+        ("moxa_34.swu", "34"),   # wrong hardware type
+    ])
+    def test_simulate_ota_update_incompatible(self, api, artifact, version):
+        """Test OTA update rejects incompatible artifacts without changing the node"""
+        api.api_post_version_to_ota_channel(OTA_AHN2, artifact)
         
-        # Simulate DFU (should fail)
-        result = api.simulate_endpoint_dfu("EP1_001", "2.0")
-        assert result is False
+        assert api.simulate_ota_update(UUID_AHN2, version) is False
+        assert api.api_get_node_by_uuid(UUID_AHN2)["version"] == "33"
+    
+    def test_simulate_ota_update_after_clear(self, ota_ready):
+        """Test OTA update fails once its artifact is cleared from the channel"""
+        api, ota_channel, artifact = ota_ready
+        api.api_clear_ota_channel(ota_channel, artifact)
+        
+        assert api.simulate_ota_update(UUID_AHN2, "34") is False
+        assert api.api_get_node_by_uuid(UUID_AHN2)["version"] == "33"
+    
+    def test_simulate_ota_update_after_clear_of_zero_padded_artifact(self, ota_ready):
+        """Test clearing ahn2_034.swu leaves ahn2_34.swu available for update"""
+        api, ota_channel, _ = ota_ready
+        api.api_post_version_to_ota_channel(ota_channel, "ahn2_034.swu")
+        api.api_clear_ota_channel(ota_channel, "ahn2_034.swu")
+        
+        assert api.simulate_ota_update(UUID_AHN2, "34") is True
+        assert api.api_get_node_by_uuid(UUID_AHN2)["version"] == "34"
+    
+    def test_simulate_ota_update_requires_exact_artifact(self, ota_ready):
+        """Test a zero-padded version does not match an unpadded artifact"""
+        api, _, _ = ota_ready
+        
+        assert api.simulate_ota_update(UUID_AHN2, "034") is False
+        assert api.api_get_node_by_uuid(UUID_AHN2)["version"] == "33"
+    
+    @pytest.mark.parametrize("max_workers", [None, 3])
+    def test_bulk_simulate_ota_update(self, api, max_workers):
+        """Test OTA updates across several nodes in one call"""
+        api.api_post_version_to_ota_channel(OTA_AHN2, SWU_AHN2_34)
+        api.api_post_version_to_ota_channel("OTA_MOXA_TBCDB1045003", "moxa_35.swu")
+        
+        result = api.bulk_simulate_ota_update([
+            (UUID_AHN2, "34"),
+            ("Cassia_TBCDB1045002", "34"),  # nothing uploaded
+            ("MOXA_TBCDB1045003", "35"),
+        ], max_workers=max_workers)
+        assert result == {
+            UUID_AHN2: True,
+            "Cassia_TBCDB1045002": False,
+            "MOXA_TBCDB1045003": True,
+        }
+        assert api.api_get_node_by_uuid("MOXA_TBCDB1045003")["version"] == "35"
     
-    def test_simulate_endpoint_dfu_low_battery(self):
-        """Test endpoint DFU with low battery"""
-        api = AuguryAPI()
+    @pytest.mark.parametrize("max_workers", [None, 2])
+    def test_bulk_simulate_endpoint_dfu(self, api, max_workers):
+        """Test DFU across several endpoints in one call"""
+        api.set_endpoint_backlog("EP2_002", 5)
         
-        # Set battery below threshold
-        api.set_endpoint_battery("EP1_001", 2000)
-        api.set_endpoint_backlog("EP1_001", 0)
+        result = api.bulk_simulate_endpoint_dfu(
+            [("EP1_001", "2.0"), ("EP2_002", "2.0"), ("Canary_003", "2.0")],
+            max_workers=max_workers,
+        )
+        assert result == {"EP1_001": True, "EP2_002": False, "Canary_003": True}
+    
+    @pytest.mark.parametrize("max_workers", [None, 2])
+    def test_bulk_simulate_rejects_duplicate_ids(self, ota_ready, max_workers):
+        """Test bulk updates reject repeated ids before updating anything"""
+        api, _, _ = ota_ready
         
-        # Simulate DFU (should fail)
+        with pytest.raises(ValueError):
+            api.bulk_simulate_ota_update([(UUID_AHN2, "34"), (UUID_AHN2, "35")], max_workers=max_workers)
+        with pytest.raises(ValueError):
+            api.bulk_simulate_endpoint_dfu([("EP1_001", "2.0"), ("EP1_001", "3.0")], max_workers=max_workers)
+        assert api.api_get_node_by_uuid(UUID_AHN2)["version"] == "33"
+        assert api.api_get_endpoint_by_serial("EP1_001")["version"] == "1.0"
+    
+    @pytest.mark.parametrize("ep1_state,expected", [
+        ((0, 3000), True),     # no backlog, battery above threshold
+        ((5, 3000), False),    # backlog > 0
+        ((0, 2000), False),    # battery below threshold
+    ], indirect=["ep1_state"])
+    def test_simulate_endpoint_dfu(self, ep1_state, expected):
+        """Test endpoint DFU under different backlog and battery conditions"""
+        api = ep1_state
         result = api.simulate_endpoint_dfu("EP1_001", "2.0")
-        assert result is False
+        assert result is expected
+        
+        # Version only changes when the DFU succeeds
+        endpoint_info = api.api_get_endpoint_by_serial("EP1_001")
+        assert endpoint_info["version"] == ("2.0" if expected else "1.0")
 
 
 if __name__ == "__main__":
-    pytest.main([__file__])
+    sys.exit(pytest.main([__file__]))